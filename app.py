@@ -28,8 +28,12 @@ if __name__ == '__main__':
         
         sys.argv = [
             'gunicorn',
+            '--config', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py'),
             '--bind', f'0.0.0.0:{port}',
             '--workers', '4',
+            '--worker-class', 'gthread',
+            '--threads', '2',
+            '--worker-tmp-dir', '/dev/shm',  # heartbeat em tmpfs (evita fchmod em disco)
             '--timeout', '300',
             '--keep-alive', '2',
             '--max-requests', '1000',
@@ -0,0 +1,13 @@
+"""
+Hooks do gunicorn - UDS Utils PDF Tools
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def post_fork(server, worker):
+    """Cria os pools de processos/threads no worker antes de ele iniciar as threads de requisição"""
+    from src.utils.pool import start_pools
+    start_pools()
@@ -3,14 +3,23 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, jsonify
 from src.models.user import db
+from src.utils.json_provider import ORJSON_AVAILABLE, OrjsonProvider
 from src.routes.user import user_bp
 from src.routes.pdf_compress import pdf_compress_bp
-from src.routes.pdf_merge import pdf_merge_bp
+from src.routes.pdf_merge import pdf_merge_bp, MAX_FILE_SIZE, MAX_FILES
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+if ORJSON_AVAILABLE:
+    # jsonify passa a serializar com orjson
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+# Werkzeug rejeita requisições acima do maior upload legítimo (mesclagem)
+# antes de processar o corpo multipart
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILES * MAX_FILE_SIZE + 1024 * 1024
+# Delegar o envio dos PDFs ao proxy reverso (X-Sendfile), liberando o worker
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
 
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(pdf_compress_bp, url_prefix='/api/pdf')
@@ -23,6 +32,15 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+@app.errorhandler(413)
+def request_too_large(error):
+    message = f'Requisição muito grande. Tamanho máximo por arquivo: {MAX_FILE_SIZE // (1024 * 1024)}MB'
+    return jsonify({
+        'success': False,
+        'message': message,
+        'error': message
+    }), 413
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
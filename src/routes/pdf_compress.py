@@ -1,24 +1,21 @@
 import os
 import tempfile
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from src.services.pdf_compressor import PDFCompressor
-import re
+from src.utils.files import SCRATCH_DIR, is_pdf_file, upload_is_pdf, save_upload
+from src.utils.http import send_pdf, static_json_response
+from src.utils.text import sanitize_text
 
 pdf_compress_bp = Blueprint('pdf_compress', __name__)
 
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
-def sanitize_text(text: str) -> str:
-    """Remove caracteres nulos e UTF-8 inválidos"""
-    if not text:
-        return ""
-    # Remove caracteres nulos
-    text = text.replace('\x00', '')
-    # Remove outros caracteres de controle problemáticos
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-    return text
+# Folga para o envelope multipart (boundary, cabeçalhos, compression_type) na
+# verificação antecipada do Content-Length; o limite exato do arquivo é aplicado por save_upload
+MULTIPART_OVERHEAD = 64 * 1024  # 64KB
 
 def allowed_file(filename):
     """Verifica se o arquivo tem extensão permitida"""
@@ -29,6 +26,13 @@ def allowed_file(filename):
 def compress_pdf():
     """Endpoint para compressão de PDF"""
     try:
+        # Rejeitar uploads grandes antes de ler o corpo da requisição
+        if request.content_length is not None and request.content_length > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+            return jsonify({
+                'success': False,
+                'message': f'Arquivo muito grande. Tamanho máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
+            }), 400
+        
         # Verificar se foi enviado um arquivo
         if 'file' not in request.files:
             return jsonify({
@@ -56,25 +60,33 @@ def compress_pdf():
                 'message': 'Apenas arquivos PDF são permitidos'
             }), 400
         
-        # Verificar tamanho do arquivo
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
+        # Rejeitar arquivos que não começam com a assinatura PDF antes de gravá-los
+        if not upload_is_pdf(file):
             return jsonify({
                 'success': False,
-                'message': f'Arquivo muito grande. Tamanho máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
+                'message': 'O arquivo enviado não é um PDF válido'
             }), 400
         
-        # Salvar arquivo temporariamente
-        temp_dir = tempfile.gettempdir()
+        # Salvar arquivo temporariamente (em blocos, verificando o tamanho),
+        # com nome único no diretório de trabalho
         filename = secure_filename(original_filename)
-        temp_input_path = os.path.join(temp_dir, f"input_{filename}")
-        
-        file.save(temp_input_path)
+        fd, temp_input_path = tempfile.mkstemp(prefix='input_', suffix='.pdf', dir=SCRATCH_DIR)
+        os.close(fd)
         
         try:
+            if not save_upload(file, temp_input_path, MAX_FILE_SIZE):
+                return jsonify({
+                    'success': False,
+                    'message': f'Arquivo muito grande. Tamanho máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
+                }), 400
+            
+            # Verificar o marcador de fim de arquivo antes de acionar o pypdf/Ghostscript
+            if not is_pdf_file(temp_input_path):
+                return jsonify({
+                    'success': False,
+                    'message': 'O arquivo enviado não é um PDF válido'
+                }), 400
+            
             # Comprimir PDF
             success, message, stats, output_path = PDFCompressor.compress_pdf(
                 temp_input_path, 
@@ -82,22 +94,8 @@ def compress_pdf():
             )
             
             if success and output_path:
-                # Preparar resposta com estatísticas
-                response_data = {
-                    'success': True,
-                    'message': message,
-                    'stats': stats,
-                    'original_filename': original_filename,
-                    'compressed_filename': f"compressed_{filename}"
-                }
-                
                 # Retornar arquivo comprimido
-                return send_file(
-                    output_path,
-                    as_attachment=True,
-                    download_name=f"compressed_{filename}",
-                    mimetype='application/pdf'
-                )
+                return send_pdf(output_path, f"compressed_{filename}")
             else:
                 return jsonify({
                     'success': False,
@@ -109,6 +107,9 @@ def compress_pdf():
             if os.path.exists(temp_input_path):
                 os.remove(temp_input_path)
     
+    except HTTPException:
+        # Erros HTTP do Werkzeug (ex.: 413) seguem para os handlers da aplicação
+        raise
     except Exception as e:
         error_msg = sanitize_text(str(e))
         return jsonify({
@@ -116,32 +117,36 @@ def compress_pdf():
             'message': f'Erro interno do servidor: {error_msg}'
         }), 500
 
+_INFO_RESPONSE = static_json_response({
+    'success': True,
+    'compression_types': {
+        'optimized': {
+            'name': 'Otimizada',
+            'description': 'Compressão avançada com redução significativa de tamanho. Mantém excelente qualidade visual.',
+            'recommended_for': 'Uso geral e documentos importantes onde qualidade e tamanho são importantes'
+        },
+        "maximum": {
+            "name": "Máxima",
+            "description": "Compressão agressiva com redução de qualidade de imagens (até 70%). Máxima economia de espaço.",
+            "recommended_for": "Arquivos onde o tamanho é mais importante que a qualidade visual"
+        }
+    },
+    'max_file_size': f'{MAX_FILE_SIZE // (1024*1024)}MB',
+    'allowed_extensions': sorted(ALLOWED_EXTENSIONS)
+})
+
 @pdf_compress_bp.route('/info', methods=['GET'])
 def get_compression_info():
     """Endpoint para obter informações sobre os tipos de compressão"""
-    return jsonify({
-        'success': True,
-        'compression_types': {
-            'optimized': {
-                'name': 'Otimizada',
-                'description': 'Compressão avançada com redução significativa de tamanho. Mantém excelente qualidade visual.',
-                'recommended_for': 'Uso geral e documentos importantes onde qualidade e tamanho são importantes'
-            },
-            "maximum": {
-                "name": "Máxima",
-                "description": "Compressão agressiva com redução de qualidade de imagens (até 70%). Máxima economia de espaço.",
-                "recommended_for": "Arquivos onde o tamanho é mais importante que a qualidade visual"
-            }
-        },
-        'max_file_size': f'{MAX_FILE_SIZE // (1024*1024)}MB',
-        'allowed_extensions': list(ALLOWED_EXTENSIONS)
-    })
+    return _INFO_RESPONSE()
+
+_HEALTH_RESPONSE = static_json_response({
+    'success': True,
+    'message': 'Serviço de compressão PDF funcionando corretamente',
+    'service': 'UDS Utils - PDF Compress'
+})
 
 @pdf_compress_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar saúde do serviço"""
-    return jsonify({
-        'success': True,
-        'message': 'Serviço de compressão PDF funcionando corretamente',
-        'service': 'UDS Utils - PDF Compress'
-    })
+    return _HEALTH_RESPONSE()
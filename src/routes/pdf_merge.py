@@ -1,9 +1,12 @@
 import os
 import tempfile
 import uuid
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from src.services.pdf_merger import PDFMerger
+from src.utils.files import SCRATCH_DIR, is_pdf_file, upload_is_pdf, save_uploads
+from src.utils.http import send_pdf, static_json_response
 
 pdf_merge_bp = Blueprint('pdf_merge', __name__)
 
@@ -16,33 +19,30 @@ def allowed_file(filename):
     """Verifica se o arquivo tem extensão permitida"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def validate_file_size(file):
-    """Valida o tamanho do arquivo"""
-    file.seek(0, 2)  # Ir para o final do arquivo
-    size = file.tell()
-    file.seek(0)  # Voltar para o início
-    return size <= MAX_FILE_SIZE
+_HEALTH_RESPONSE = static_json_response({
+    'success': True,
+    'message': 'Serviço de mesclagem PDF funcionando corretamente',
+    'service': 'UDS Utils - PDF Merge'
+})
 
 @pdf_merge_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar se o serviço de mesclagem está funcionando"""
-    return jsonify({
-        'success': True,
-        'message': 'Serviço de mesclagem PDF funcionando corretamente',
-        'service': 'UDS Utils - PDF Merge'
-    })
+    return _HEALTH_RESPONSE()
+
+_INFO_RESPONSE = static_json_response({
+    'success': True,
+    'service': 'UDS Utils - PDF Merge',
+    'max_files': MAX_FILES,
+    'max_file_size': f'{MAX_FILE_SIZE // (1024 * 1024)}MB',
+    'supported_formats': sorted(ALLOWED_EXTENSIONS),
+    'description': 'Mescla múltiplos arquivos PDF e imagens PNG/JPG em um único documento PDF'
+})
 
 @pdf_merge_bp.route('/info', methods=['GET'])
 def merge_info():
     """Endpoint com informações sobre a mesclagem"""
-    return jsonify({
-        'success': True,
-        'service': 'UDS Utils - PDF Merge',
-        'max_files': MAX_FILES,
-        'max_file_size': f'{MAX_FILE_SIZE // (1024 * 1024)}MB',
-        'supported_formats': list(ALLOWED_EXTENSIONS),
-        'description': 'Mescla múltiplos arquivos PDF e imagens PNG/JPG em um único documento PDF'
-    })
+    return _INFO_RESPONSE()
 
 
 @pdf_merge_bp.route('/merge', methods=['POST'])
@@ -74,6 +74,8 @@ def merge_pdfs():
         # Validar arquivos
         temp_files = []
         file_names = []
+        output_path = None
+        sent = False
         
         try:
             for i, file in enumerate(files):
@@ -91,20 +93,38 @@ def merge_pdfs():
                         'error': f'Arquivo {file.filename} não é um tipo suportado (PDF, PNG, JPG)'
                     }), 400
                 
-                # Verificar tamanho
-                if not validate_file_size(file):
+                # Rejeitar PDFs sem assinatura antes de gravá-los
+                file_ext = os.path.splitext(file.filename)[1].lower()
+                if file_ext == '.pdf' and not upload_is_pdf(file):
                     return jsonify({
                         'success': False,
-                        'error': f'Arquivo {file.filename} excede o tamanho máximo de {MAX_FILE_SIZE // (1024 * 1024)}MB'
+                        'error': f'Arquivo {file.filename} não é um PDF válido'
                     }), 400
                 
-                # Salvar arquivo temporário mantendo extensão original
-                file_ext = os.path.splitext(file.filename)[1].lower()
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext)
-                file.save(temp_file.name)
+                # Reservar arquivo temporário mantendo extensão original
+                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext, dir=SCRATCH_DIR)
+                temp_file.close()
                 temp_files.append(temp_file.name)
                 file_names.append(secure_filename(file.filename))
             
+            # Gravar todos os uploads em paralelo
+            # (em blocos, abortando ao exceder o tamanho máximo)
+            saved = save_uploads(files, temp_files, MAX_FILE_SIZE)
+            for file, fits in zip(files, saved):
+                if not fits:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Arquivo {file.filename} excede o tamanho máximo de {MAX_FILE_SIZE // (1024 * 1024)}MB'
+                    }), 400
+            
+            # Verificação barata de assinatura e %%EOF antes do parse completo
+            for file, temp_path in zip(files, temp_files):
+                if temp_path.endswith('.pdf') and not is_pdf_file(temp_path):
+                    return jsonify({
+                        'success': False,
+                        'error': f'Arquivo {file.filename} não é um PDF válido'
+                    }), 400
+            
             # Validar se todos os arquivos são válidos (PDFs e imagens)
             is_valid, validation_message = PDFMerger.validate_files(temp_files)
             if not is_valid:
@@ -115,27 +135,27 @@ def merge_pdfs():
             
             # Criar arquivo de saída
             output_filename = f"merged_pdf_{uuid.uuid4().hex[:8]}.pdf"
-            output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf').name
+            output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=SCRATCH_DIR).name
             
             # Realizar mesclagem (PDFs e imagens)
             success, message, stats = PDFMerger.merge_files(temp_files, output_path)
             
             if not success:
+                # Arquivo enviado inválido (ex.: imagem corrompida após o cabeçalho) -> 400
                 return jsonify({
                     'success': False,
                     'error': message
-                }), 500
+                }), 400 if stats.get('invalid_file') else 500
             
-            # Retornar arquivo mesclado
-            return send_file(
-                output_path,
-                as_attachment=True,
-                download_name=output_filename,
-                mimetype='application/pdf'
-            )
+            # Retornar arquivo mesclado (send_pdf passa a ser dono do arquivo)
+            response = send_pdf(output_path, output_filename)
+            sent = True
+            return response
             
         finally:
-            # Limpar arquivos temporários de entrada
+            # Limpar arquivos temporários de entrada e a saída não enviada
+            if output_path is not None and not sent:
+                temp_files.append(output_path)
             for temp_file in temp_files:
                 try:
                     if os.path.exists(temp_file):
@@ -143,6 +163,9 @@ def merge_pdfs():
                 except:
                     pass
     
+    except HTTPException:
+        # Erros HTTP do Werkzeug (ex.: 413) seguem para os handlers da aplicação
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
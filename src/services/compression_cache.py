@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import uuid
+from typing import Optional, Tuple
+from src.services.compression_stats import CompressionStats
+from src.utils.files import link_or_copy
+
+# Cache opcional de resultados: ativado ao definir PDF_COMPRESSOR_CACHE_DIR
+CACHE_DIR = os.environ.get('PDF_COMPRESSOR_CACHE_DIR')
+CACHE_MAX_BYTES = int(os.environ.get('PDF_COMPRESSOR_CACHE_MAX_BYTES', 1024 * 1024 * 1024))  # 1GB
+
+# Tamanho dos blocos lidos ao calcular o hash do arquivo
+HASH_CHUNK_SIZE = 64 * 1024  # 64KB
+
+def cache_enabled() -> bool:
+    """Indica se o cache de resultados está configurado"""
+    return bool(CACHE_DIR)
+
+def cache_key(input_path: str, compression_type: str) -> str:
+    """Chave do cache: hash BLAKE2b do conteúdo do PDF combinado com o tipo de compressão"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(input_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f"{digest.hexdigest()}_{compression_type}"
+
+def _entry_paths(key: str) -> Tuple[str, str]:
+    """Caminhos do PDF e do arquivo de estatísticas de uma entrada"""
+    base = os.path.join(CACHE_DIR, key)
+    return base + '.pdf', base + '.json'
+
+def lookup(key: str, output_path: str) -> Optional[Tuple[str, CompressionStats]]:
+    """
+    Procura um resultado no cache e o vincula (hardlink) em output_path
+
+    Retorna (mensagem, estatísticas) ou None se a entrada não existir.
+    """
+    pdf_path, meta_path = _entry_paths(key)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        link_or_copy(pdf_path, output_path)
+    except (OSError, ValueError):
+        return None
+
+    # Atualizar o mtime: a remoção do cache é feita pelos menos usados
+    try:
+        os.utime(pdf_path)
+    except OSError:
+        pass
+    stats = meta['stats']
+    return meta['message'], CompressionStats(stats['original_size'], stats['compressed_size'],
+                                             stats['reduction_percentage'], stats['method'])
+
+def store(key: str, output_path: str, message: str, stats: CompressionStats) -> None:
+    """Guarda o resultado no cache (hardlink do PDF gerado) e aplica o limite de tamanho"""
+    pdf_path, meta_path = _entry_paths(key)
+    tmp_suffix = f'.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        # Gravar em nomes temporários e publicar com os.replace (atômico)
+        link_or_copy(output_path, pdf_path + tmp_suffix)
+        with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+            json.dump({'message': message, 'stats': stats.to_dict()}, f)
+        os.replace(pdf_path + tmp_suffix, pdf_path)
+        os.replace(meta_path + tmp_suffix, meta_path)
+    except OSError as e:
+        print(f"Falha ao gravar no cache de compressão: {str(e)}")
+        for path in (pdf_path + tmp_suffix, meta_path + tmp_suffix):
+            if os.path.exists(path):
+                os.unlink(path)
+        return
+
+    evict()
+
+def evict() -> None:
+    """Remove as entradas usadas há mais tempo até o cache caber em CACHE_MAX_BYTES"""
+    entries = []
+    total = 0
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith('.pdf'):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    entries.sort()
+    for _, size, pdf_path in entries:
+        if total <= CACHE_MAX_BYTES:
+            break
+        for path in (pdf_path, pdf_path[:-len('.pdf')] + '.json'):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        total -= size
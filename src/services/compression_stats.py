@@ -0,0 +1,31 @@
+from dataclasses import asdict, dataclass
+from src.utils.text import format_file_size
+
+@dataclass(slots=True)
+class CompressionStats:
+    """Estatísticas de uma compressão; os tamanhos formatados são gerados sob demanda"""
+    original_size: int
+    compressed_size: int
+    reduction_percentage: float
+    method: str
+    
+    @property
+    def original_size_formatted(self) -> str:
+        """Tamanho original formatado para exibição"""
+        return format_file_size(self.original_size)
+    
+    @property
+    def compressed_size_formatted(self) -> str:
+        """Tamanho comprimido formatado para exibição"""
+        return format_file_size(self.compressed_size)
+    
+    def __getitem__(self, key: str):
+        """Acesso no estilo dict (stats['method']), compatível com o formato anterior"""
+        return getattr(self, key)
+    
+    def to_dict(self) -> dict:
+        """Representação serializável, incluindo os tamanhos formatados"""
+        data = asdict(self)
+        data['original_size_formatted'] = self.original_size_formatted
+        data['compressed_size_formatted'] = self.compressed_size_formatted
+        return data
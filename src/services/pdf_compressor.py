@@ -1,288 +1,774 @@
+import mmap
 import os
+import select
+import shutil
 import tempfile
-import re
 import subprocess
+import threading
+import time
+import uuid
+from itertools import repeat
 from pypdf import PdfWriter, PdfReader
-from typing import Tuple, Optional
+from pypdf.generic import EncodedStreamObject, NameObject
+from typing import List, Tuple, Optional
+from src.services import compression_cache
+from src.services.compression_stats import CompressionStats
+from src.utils.files import SCRATCH_DIR, is_pdf_file, link_or_copy
+from src.utils.pool import get_process_pool, get_thread_pool, in_pool_worker
+from src.utils.text import format_file_size, sanitize_text
+
+import zlib
+
+try:
+    # ISA-L: DEFLATE acelerado por SIMD, saída compatível com zlib
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+# Abaixo deste número de páginas a compressão dos content streams é serial
+PARALLEL_MIN_PAGES = 4
+
+# Buffer de escrita do PDF de saída: agrupa as escritas pequenas do pypdf
+WRITE_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+# PDFs pequenos que já usam object streams (/ObjStm) não são reprocessados
+# na compressão otimizada: o ganho é desprezível e o arquivo pode até crescer
+OBJSTM_SCAN_BYTES = 64 * 1024  # 64KB
+ALREADY_OPTIMIZED_MAX_SIZE = 1024 * 1024  # 1MB
+
+# Abaixo deste tamanho o PDF é devolvido sem compressão: o custo de
+# inicialização do Ghostscript domina e o arquivo costuma até crescer
+MIN_COMPRESS_BYTES = 64 * 1024  # 64KB
+
+# PDFs acima deste tamanho são rejeitados antes de qualquer parse ou Ghostscript
+MAX_INPUT_BYTES = int(os.environ.get('PDF_MAX_INPUT_BYTES', 500 * 1024 * 1024))  # 500MB
+
+# Interpretador alternativo (ex.: PyPy) para o fallback PyPDF, executado em subprocesso
+FALLBACK_PYTHON = os.environ.get('PDF_FALLBACK_PYTHON')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _deflate(data: bytes, level: int) -> bytes:
+    """Comprime um content stream com DEFLATE
+
+    O ISA-L só vai até o nível 3: é usado nos níveis abaixo de 9, trocando
+    um pouco de razão por velocidade; o nível máximo continua no zlib.
+    """
+    if isal_zlib is not None and level < 9:
+        return isal_zlib.compress(data, min(level, isal_zlib.ISAL_BEST_COMPRESSION))
+    return zlib.compress(data, level)
+
+# Caminho do Ghostscript, resolvido uma vez na importação (None se não instalado)
+_GS_PATH = shutil.which('gs')
+
+def refresh_ghostscript_path() -> None:
+    """Resolve novamente o caminho do Ghostscript (ex.: após instalá-lo ou em testes)"""
+    global _GS_PATH
+    _GS_PATH = shutil.which('gs')
+
+# Tempo máximo de um job do Ghostscript (mesmo limite do subprocesso avulso)
+GS_TIMEOUT = 300
+
+# Após falhas consecutivas o worker persistente é desativado no processo
+GS_WORKER_MAX_FAILURES = 3
+
+# Argumentos do Ghostscript para cada tipo de compressão (a saída e a entrada
+# são acrescentadas por run_ghostscript)
+# A compressão otimizada declara os parâmetros explicitamente em vez de partir
+# do preset /ebook e sobrescrever metade dele
+_GS_OPTIMIZED_ARGS = (
+    '-sDEVICE=pdfwrite',
+    '-dCompatibilityLevel=1.5',
+    '-dNOPAUSE',
+    '-dQUIET',
+    '-dBATCH',
+    '-dDownsampleColorImages=true',
+    '-dColorImageDownsampleType=/Bicubic',
+    '-dColorImageResolution=150',
+    '-dAutoFilterColorImages=false',
+    '-dColorImageFilter=/DCTEncode',
+    '-dDownsampleGrayImages=true',
+    '-dGrayImageDownsampleType=/Bicubic',
+    '-dGrayImageResolution=150',
+    '-dDownsampleMonoImages=true',
+    '-dMonoImageResolution=300',
+    '-dCompressPages=true',
+    '-dUseFlateCompression=true',
+    '-dOptimize=true'
+)
+_GS_MAXIMUM_ARGS = (
+    '-sDEVICE=pdfwrite',
+    '-dCompatibilityLevel=1.5',
+    '-dPDFSETTINGS=/screen',
+    '-dNOPAUSE',
+    '-dQUIET',
+    '-dBATCH',
+    '-dColorImageResolution=36',
+    '-dGrayImageResolution=36',
+    '-dMonoImageResolution=36'
+)
+
+# Opcional (PDF_GS_CHECKPOINT=1): PDFs longos são processados em blocos de páginas;
+# cada bloco concluído fica salvo no diretório de trabalho e é reaproveitado se a
+# requisição for repetida (ex.: após um timeout) dentro de CHECKPOINT_TTL. Desativado
+# por padrão: unir os blocos perde o compartilhamento de recursos entre eles
+# (saída maior) e links entre páginas de blocos diferentes
+CHECKPOINT_ENABLED = os.environ.get('PDF_GS_CHECKPOINT', '0') == '1'
+CHECKPOINT_PAGES = 200
+CHECKPOINT_TTL = 60 * 60  # 1h
+CHECKPOINT_PREFIX = 'gs_ckpt_'
+
+def _ps_string(text: str) -> str:
+    """Escapa um texto como string literal PostScript"""
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f'({escaped})'
+
+class _GhostscriptWorker:
+    """
+    Interpretador Ghostscript de longa duração, alimentado com jobs PostScript via stdin
+    
+    Evita o custo de inicialização do gs (init.ps, fontes) a cada arquivo. Cada
+    worker é iniciado com os argumentos de um único tipo de compressão, os mesmos
+    do subprocesso avulso: os distiller params (e o preset -dPDFSETTINGS) são
+    aplicados pelo próprio gs na linha de comando e ficam iguais em todos os jobs,
+    sem depender do que o interpretador executou antes.
+    
+    Um único job roda por vez; se o worker estiver ocupado ou falhar, o chamador
+    recorre ao subprocesso avulso.
+    """
+    
+    def __init__(self, settings: Tuple[str, ...]):
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._process = None
+        self._pid = None
+        self._failures = 0
+        self._job_dir = os.path.realpath(SCRATCH_DIR)
+    
+    def _start(self) -> None:
+        """Inicia o interpretador com leitura/escrita liberadas apenas no diretório temporário"""
+        cmd = [
+            _GS_PATH,
+            '-q',
+            '-dSAFER',
+            *self._settings,
+            '-sOutputFile=/dev/null',
+            f'--permit-file-read={self._job_dir}/',
+            f'--permit-file-write={self._job_dir}/',
+            '--permit-file-write=/dev/null',
+            '-'
+        ]
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, bufsize=0)
+        self._pid = os.getpid()
+    
+    def _stop(self) -> None:
+        """Encerra o interpretador (ele é recriado no próximo job)"""
+        if self._process is not None and self._pid == os.getpid():
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+    
+    @staticmethod
+    def _build_job(input_path: str, output_path: str, token: str) -> bytes:
+        """Monta o job PostScript: troca a saída, executa a entrada e fecha o PDF"""
+        lines = [
+            f'{{ << /OutputFile {_ps_string(output_path)} >> setpagedevice {_ps_string(input_path)} run }}',
+            f'stopped {{ clear (GSFAIL {token}\\n) }} {{ (GSDONE {token}\\n) }} ifelse',
+            # Trocar o OutputFile fecha o dispositivo e finaliza o PDF (xref/trailer)
+            '{ << /OutputFile (/dev/null) >> setpagedevice } stopped pop',
+            'print flush'
+        ]
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+    
+    def _wait_for(self, token: str, timeout: float) -> bool:
+        """Lê o stdout do gs até encontrar o sentinela do job"""
+        done = f'GSDONE {token}'.encode()
+        failed = f'GSFAIL {token}'.encode()
+        fd = self._process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        buffer = b''
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired('gs', timeout)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                raise OSError("Ghostscript encerrou inesperadamente")
+            buffer = buffer[-64:] + chunk
+            if done in buffer:
+                return True
+            if failed in buffer:
+                return False
+    
+    def submit(self, input_path: str, output_path: str, timeout: float = GS_TIMEOUT) -> bool:
+        """
+        Executa um job no interpretador persistente
+        
+        Retorna False quando o job não pôde ser atendido (worker ocupado, desativado,
+        arquivos fora do diretório liberado ou erro do gs). Timeout é propagado.
+        
+        Só falhas do interpretador (encerramento inesperado, timeout) contam para
+        GS_WORKER_MAX_FAILURES; um PDF de entrada inválido apenas reinicia o worker.
+        """
+        # O gs recebe os caminhos reais: as permissões do -dSAFER usam o realpath
+        input_path = os.path.realpath(input_path)
+        output_path = os.path.realpath(output_path)
+        for path in (input_path, output_path):
+            if os.path.dirname(path) != self._job_dir:
+                return False
+        if not self._lock.acquire(blocking=False):
+            return False
+        
+        try:
+            if self._failures >= GS_WORKER_MAX_FAILURES:
+                return False
+            if self._process is None or self._pid != os.getpid() or self._process.poll() is not None:
+                self._start()
+            
+            token = uuid.uuid4().hex
+            try:
+                self._process.stdin.write(self._build_job(input_path, output_path, token))
+                succeeded = self._wait_for(token, timeout)
+            except subprocess.TimeoutExpired:
+                self._stop()
+                self._failures += 1
+                raise
+            except OSError:
+                self._stop()
+                self._failures += 1
+                return False
+            
+            # Só aceitar a saída se o PDF foi finalizado por completo; caso contrário
+            # o erro veio do arquivo de entrada: recomeçar com um interpretador limpo
+            if not succeeded or not is_pdf_file(output_path):
+                self._stop()
+                return False
+            
+            self._failures = 0
+            return True
+        finally:
+            self._lock.release()
+
+# Um interpretador persistente por tipo de compressão; outros argumentos
+# (ex.: intervalos de páginas) usam o subprocesso avulso
+_GS_WORKERS = {settings: _GhostscriptWorker(settings) for settings in (_GS_OPTIMIZED_ARGS, _GS_MAXIMUM_ARGS)}
 
 class PDFCompressor:
     """Serviço para compressão de arquivos PDF com diferentes níveis de otimização"""
     
-    @staticmethod
-    def sanitize_text(text: str) -> str:
-        """Remove caracteres nulos e UTF-8 inválidos"""
-        if not text:
-            return ""
-        # Remove caracteres nulos
-        text = text.replace('\x00', '')
-        # Remove outros caracteres de controle problemáticos
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-        return text
+    sanitize_text = staticmethod(sanitize_text)
+    format_file_size = staticmethod(format_file_size)
     
     @staticmethod
     def get_file_size(file_path: str) -> int:
         """Retorna o tamanho do arquivo em bytes"""
+        return os.stat(file_path).st_size
+    
+    @staticmethod
+    def output_size(file_path: str) -> int:
+        """Tamanho de um arquivo gerado, ou 0 se ele não foi criado"""
         try:
-            return os.path.getsize(file_path)
-        except:
+            return os.stat(file_path).st_size
+        except FileNotFoundError:
             return 0
     
     @staticmethod
-    def format_file_size(size_bytes: int) -> str:
-        """Formata o tamanho do arquivo para exibição"""
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.1f} KB"
-        else:
-            return f"{size_bytes / (1024 * 1024):.1f} MB"
+    def build_stats(original_size: int, compressed_size: int, method: str) -> CompressionStats:
+        """Calcula as estatísticas de compressão, independente do backend utilizado"""
+        reduction = ((original_size - compressed_size) / original_size) * 100
+        return CompressionStats(original_size, compressed_size, round(reduction, 1), method)
     
     @staticmethod
-    def validate_pdf(file_path: str) -> Tuple[bool, str]:
-        """Valida se o arquivo é um PDF válido"""
+    def result_stats(input_path: str, output_path: str, original_size: int,
+                     compressed_size: int, method: str) -> CompressionStats:
+        """Estatísticas do resultado; se a compressão não reduziu o arquivo, o original é devolvido"""
+        if compressed_size >= original_size:
+            link_or_copy(input_path, output_path)
+            return PDFCompressor.build_stats(original_size, original_size, 'Original (sem ganho na compressão)')
+        return PDFCompressor.build_stats(original_size, compressed_size, method)
+    
+    @staticmethod
+    def produced_by_ghostscript(reader: PdfReader) -> bool:
+        """Verifica no /Producer se o PDF já foi gerado pelo Ghostscript"""
         try:
-            if not os.path.exists(file_path):
-                return False, "Arquivo não encontrado"
+            producer = (reader.metadata or {}).get('/Producer', '')
+        except Exception:
+            return False
+        return 'Ghostscript' in str(producer)
+    
+    @staticmethod
+    def has_object_streams(file_path: str) -> bool:
+        """Verifica se o início do arquivo contém object streams (/ObjStm)"""
+        with open(file_path, 'rb') as f:
+            return b'/ObjStm' in f.read(OBJSTM_SCAN_BYTES)
+    
+    @staticmethod
+    def load_pdf(file_path: str, deep: bool = True) -> Tuple[bool, str, Optional[PdfReader], int]:
+        """
+        Valida o PDF e devolve o PdfReader aberto e o tamanho do arquivo,
+        reaproveitados pelas etapas seguintes
+        
+        O tamanho (MAX_INPUT_BYTES), a assinatura e o marcador %%EOF são verificados
+        antes de qualquer parse, rejeitando arquivos inválidos lendo apenas 2KB. Com deep=True o reader é
+        aberto (xref e trailer) e o /Count da árvore de páginas é conferido, sem resolvê-la.
+        """
+        try:
+            try:
+                file_size = os.stat(file_path).st_size
+            except FileNotFoundError:
+                return False, "Arquivo não encontrado", None, 0
+            
+            if file_size == 0:
+                return False, "Arquivo está vazio", None, 0
+            
+            if file_size > MAX_INPUT_BYTES:
+                return False, f"Arquivo excede o limite de {MAX_INPUT_BYTES} bytes", None, file_size
             
-            if os.path.getsize(file_path) == 0:
-                return False, "Arquivo está vazio"
+            if not is_pdf_file(file_path):
+                return False, "Arquivo sem assinatura PDF ou marcador %%EOF", None, file_size
+            
+            if not deep:
+                return True, "PDF válido", None, file_size
             
             # Tentar ler o PDF
-            with open(file_path, 'rb') as f:
-                try:
-                    reader = PdfReader(f)
-                    if len(reader.pages) == 0:
-                        return False, "PDF não contém páginas"
-                    return True, "PDF válido"
-                except Exception as e:
-                    return False, f"PDF corrompido: {str(e)}"
+            try:
+                reader = PDFCompressor.open_reader(file_path)
+                # /Count da raiz da árvore de páginas, lido do trailer sem percorrê-la
+                if int(reader.trailer['/Root']['/Pages'].get('/Count', 0)) <= 0:
+                    return False, "PDF não contém páginas", None, file_size
+                return True, "PDF válido", reader, file_size
+            except Exception as e:
+                return False, f"PDF corrompido: {str(e)}", None, file_size
                     
         except Exception as e:
-            return False, f"Erro ao validar PDF: {str(e)}"
+            return False, f"Erro ao validar PDF: {str(e)}", None, 0
     
     @staticmethod
-    def fallback_pypdf_compression(input_path: str, output_path: str, level: int = 6) -> Tuple[bool, str]:
-        """Compressão fallback usando apenas PyPDF"""
+    def validate_pdf(file_path: str, deep: bool = False) -> Tuple[bool, str]:
+        """Valida se o arquivo é um PDF válido (deep=True também abre o PdfReader)"""
+        is_valid, message, _, _ = PDFCompressor.load_pdf(file_path, deep=deep)
+        return is_valid, message
+    
+    @staticmethod
+    def open_reader(file_path: str) -> PdfReader:
+        """Abre o PDF via mmap, sem copiar o arquivo inteiro para a memória do processo"""
+        with open(file_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return PdfReader(data, strict=False)
+    
+    @staticmethod
+    def compress_content_streams(writer: PdfWriter, level: int) -> None:
+        """Aplica FlateDecode aos content streams de todas as páginas do writer"""
+        pages = list(writer.pages)
+        
+        # Extrair os dados no processo principal e comprimir (em paralelo
+        # somente a partir de PARALLEL_MIN_PAGES páginas e fora do pool)
+        contents = [page.get_contents() for page in pages]
+        datas = [content.get_data() if content is not None else b'' for content in contents]
+        if len(pages) < PARALLEL_MIN_PAGES or in_pool_worker():
+            compressed = [_deflate(data, level) for data in datas]
+        else:
+            # zlib/ISA-L liberam o GIL: threads evitam copiar os streams para outros processos
+            compressed = get_thread_pool().map(_deflate, datas, repeat(level))
+        
+        # Reanexar os streams comprimidos (o writer não é thread/process-safe)
+        for page, content, data in zip(pages, contents, compressed):
+            if content is None:
+                continue
+            content_obj = EncodedStreamObject()
+            content_obj[NameObject('/Filter')] = NameObject('/FlateDecode')
+            content_obj._data = data
+            page.replace_contents(content_obj)
+    
+    @staticmethod
+    def fallback_pypdf_compression(input_path: str, output_path: str, level: int = 6,
+                                   reader: Optional[PdfReader] = None) -> Tuple[bool, str]:
+        """Compressão fallback usando apenas PyPDF (reaproveita o reader já validado, se informado)"""
         try:
-            with open(input_path, 'rb') as input_file:
-                reader = PdfReader(input_file)
-                writer = PdfWriter()
-                
-                # Copiar páginas com tratamento de erro
-                for page_num in range(len(reader.pages)):
-                    try:
-                        page = reader.pages[page_num]
-                        writer.add_page(page)
-                    except Exception as e:
-                        print(f"Erro na página {page_num}: {e}")
-                        continue
-                
-                # Aplicar compressão básica
-                writer.compress_identical_objects()
-                writer.remove_duplication()
-                
-                # Salvar arquivo comprimido
-                with open(output_path, 'wb') as output_file:
-                    writer.write(output_file)
-                
-                return True, "Compressão PyPDF realizada com sucesso"
+            # Parse único do arquivo, reaproveitado por todas as etapas
+            if reader is None:
+                reader = PDFCompressor.open_reader(input_path)
+            # Clonar a tabela de objetos inteira, sem copiar página a página
+            writer = PdfWriter(clone_from=reader)
+            
+            # Comprimir content streams das páginas
+            PDFCompressor.compress_content_streams(writer, level)
+            
+            # Deduplicar objetos idênticos e descartar órfãos em uma única passada
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+            
+            # Salvar arquivo comprimido
+            with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as output_file:
+                writer.write(output_file)
+            
+            return True, "Compressão PyPDF realizada com sucesso"
                 
         except Exception as e:
             return False, f"Erro na compressão PyPDF: {str(e)}"
     
     @staticmethod
-    def compress_pdf_optimized(input_path: str, output_path: str) -> Tuple[bool, str, dict]:
+    def qpdf_compression(input_path: str, output_path: str, optimize_images: bool = False) -> Tuple[bool, str]:
+        """Compressão via qpdf: recomprime streams e gera object streams em código nativo"""
+        qpdf_path = shutil.which('qpdf')
+        if qpdf_path is None:
+            return False, "qpdf não disponível"
+        
+        cmd = [
+            qpdf_path,
+            '--object-streams=generate',
+            '--compress-streams=y',
+            '--recompress-flate',
+            '--compression-level=9',
+            '--linearize'
+        ]
+        if optimize_images:
+            cmd += ['--optimize-images', '--oi-min-width=0', '--oi-min-height=0']
+        cmd += [input_path, output_path]
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        except subprocess.TimeoutExpired:
+            return False, "Timeout na compressão qpdf"
+        
+        # Código de saída 3 indica sucesso com avisos
+        if result.returncode in (0, 3) and PDFCompressor.output_size(output_path) > 0:
+            return True, "Compressão qpdf realizada com sucesso"
+        return False, f"Erro na compressão qpdf: {result.stderr}"
+    
+    @staticmethod
+    def external_pypdf_compression(input_path: str, output_path: str, level: int = 6) -> Tuple[bool, str]:
+        """Executa o fallback PyPDF sob o interpretador configurado em PDF_FALLBACK_PYTHON"""
+        cmd = [FALLBACK_PYTHON, '-m', 'src.services.pdf_worker', input_path, output_path, str(level)]
+        try:
+            result = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=300)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return False, f"Erro no worker PyPDF externo: {str(e)}"
+        
+        if result.returncode == 0:
+            return True, result.stdout.strip()
+        return False, f"Erro no worker PyPDF externo: {result.stderr.strip()}"
+    
+    @staticmethod
+    def fallback_compression(input_path: str, output_path: str, level: int = 6,
+                             reader: Optional[PdfReader] = None) -> Tuple[bool, str, str]:
+        """
+        Compressão sem Ghostscript: usa qpdf quando instalado e PyPDF como último recurso
+        
+        Returns:
+            Tuple[bool, str, str]: (sucesso, mensagem, backend utilizado)
+        """
+        success, msg = PDFCompressor.qpdf_compression(input_path, output_path, optimize_images=level >= 9)
+        if success:
+            return True, msg, 'qpdf'
+        
+        if FALLBACK_PYTHON:
+            success, msg = PDFCompressor.external_pypdf_compression(input_path, output_path, level=level)
+            if success:
+                return True, msg, 'PyPDF'
+            print(msg)
+        
+        success, msg = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=level, reader=reader)
+        return success, msg, 'PyPDF'
+    
+    @staticmethod
+    def run_ghostscript(settings: Tuple[str, ...], input_path: str, output_path: str,
+                        timeout: float = GS_TIMEOUT) -> subprocess.CompletedProcess:
+        """Executa o Ghostscript, preferindo o interpretador persistente ao subprocesso avulso"""
+        worker = _GS_WORKERS.get(settings)
+        if worker is not None and worker.submit(input_path, output_path, timeout):
+            return subprocess.CompletedProcess(['gs'], 0, None, b'')
+        return PDFCompressor.run_ghostscript_oneshot(settings, input_path, output_path, timeout)
+    
+    @staticmethod
+    def run_ghostscript_oneshot(settings: Tuple[str, ...], input_path: str, output_path: str,
+                                timeout: float = GS_TIMEOUT) -> subprocess.CompletedProcess:
+        """Executa o Ghostscript em um subprocesso avulso"""
+        # O PDF é escrito no stdout, redirecionado direto para o arquivo de saída
+        # (mensagens do interpretador vão para o stderr). A entrada continua sendo
+        # um caminho: o gs precisa de acesso aleatório e copiaria o stdin para disco.
+        # Somente o stderr é capturado (em bytes); é decodificado apenas em caso de falha
+        cmd = [_GS_PATH, *settings, '-sstdout=%stderr', '-sOutputFile=-', input_path]
+        with open(output_path, 'wb') as output_file:
+            return subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=output_file,
+                                  stderr=subprocess.PIPE, timeout=timeout)
+    
+    @staticmethod
+    def purge_stale_checkpoints() -> None:
+        """Remove blocos de checkpoint mais antigos que CHECKPOINT_TTL"""
+        now = time.time()
+        with os.scandir(SCRATCH_DIR) as it:
+            for entry in it:
+                if not entry.name.startswith(CHECKPOINT_PREFIX):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > CHECKPOINT_TTL:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def copy_outline(reader: PdfReader, writer: PdfWriter, items: list, parent=None) -> None:
+        """Recria no writer os marcadores do reader (mesma numeração de páginas)"""
+        item_ref = None
+        for item in items:
+            # Sublistas contêm os filhos do item anterior
+            if isinstance(item, list):
+                if item_ref is not None:
+                    PDFCompressor.copy_outline(reader, writer, item, item_ref)
+                continue
+            page_number = reader.get_destination_page_number(item)
+            if page_number is None or page_number < 0:
+                item_ref = None
+                continue
+            item_ref = writer.add_outline_item(item.title, page_number, parent=parent)
+    
+    @staticmethod
+    def run_ghostscript_checkpointed(settings: Tuple[str, ...], input_path: str, output_path: str,
+                                     reader: PdfReader, job_name: str) -> subprocess.CompletedProcess:
+        """
+        Executa o Ghostscript em blocos de CHECKPOINT_PAGES páginas para PDFs longos
+        (somente com CHECKPOINT_ENABLED)
+        
+        Os blocos são identificados pelo hash do conteúdo e pelo tipo de compressão,
+        então uma nova tentativa com o mesmo arquivo retoma do último bloco concluído.
+        No final os blocos são unidos com o pypdf (sem nova passagem pelo Ghostscript),
+        com os metadados (/Info) e marcadores do original.
+        """
+        if not CHECKPOINT_ENABLED:
+            return PDFCompressor.run_ghostscript(settings, input_path, output_path)
+        
+        try:
+            page_count = len(reader.pages)
+        except Exception:
+            page_count = 0
+        if page_count <= CHECKPOINT_PAGES:
+            return PDFCompressor.run_ghostscript(settings, input_path, output_path)
+        
+        PDFCompressor.purge_stale_checkpoints()
+        job_key = compression_cache.cache_key(input_path, job_name)
+        deadline = time.monotonic() + GS_TIMEOUT
+        
+        # Cada bloco fica aberto até a união: requisições simultâneas do mesmo arquivo
+        # compartilham os blocos, e o descritor mantém os dados mesmo se a outra
+        # requisição removê-los ao terminar
+        parts = []
+        handles = []
+        try:
+            for first in range(1, page_count + 1, CHECKPOINT_PAGES):
+                last = min(first + CHECKPOINT_PAGES - 1, page_count)
+                part_path = os.path.join(SCRATCH_DIR, f'{CHECKPOINT_PREFIX}{job_key}_{first:06d}.pdf')
+                parts.append(part_path)
+                try:
+                    handles.append(open(part_path, 'rb'))
+                    continue
+                except FileNotFoundError:
+                    pass
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired('gs', GS_TIMEOUT)
+                
+                # Gravar em nome temporário: só blocos completos viram checkpoint
+                tmp_path = f'{part_path}.{uuid.uuid4().hex}.tmp'
+                page_range = (f'-dFirstPage={first}', f'-dLastPage={last}')
+                try:
+                    result = PDFCompressor.run_ghostscript((*settings, *page_range), input_path, tmp_path, remaining)
+                    if result.returncode != 0 or PDFCompressor.output_size(tmp_path) == 0:
+                        return result
+                    handles.append(open(tmp_path, 'rb'))
+                    os.replace(tmp_path, part_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+            
+            # Unir os blocos; objetos repetidos entre eles (ex.: fontes) são deduplicados
+            writer = PdfWriter()
+            for handle in handles:
+                writer.append(PdfReader(handle, strict=False), import_outline=False)
+            
+            # Metadados e marcadores do original (o Ghostscript só os mantém dentro de cada bloco)
+            try:
+                if reader.metadata:
+                    writer.add_metadata(dict(reader.metadata))
+                PDFCompressor.copy_outline(reader, writer, reader.outline)
+            except Exception as e:
+                print(f"Falha ao copiar metadados/marcadores: {PDFCompressor.sanitize_text(str(e))}")
+            
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+            with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as output_file:
+                writer.write(output_file)
+        finally:
+            for handle in handles:
+                handle.close()
+        
+        # Outra requisição com o mesmo arquivo pode já ter removido os blocos
+        for part_path in parts:
+            try:
+                os.unlink(part_path)
+            except FileNotFoundError:
+                pass
+        return subprocess.CompletedProcess(['gs'], 0, None, b'')
+    
+    @staticmethod
+    def compress_pdf_optimized(input_path: str, output_path: str) -> Tuple[bool, str, Optional[CompressionStats]]:
         """
         Compressão otimizada: Usa Ghostscript com configurações balanceadas
         Mantém boa qualidade visual com redução significativa de tamanho
         """
         try:
-            # Validar PDF de entrada
-            is_valid, validation_msg = PDFCompressor.validate_pdf(input_path)
+            # Validar PDF de entrada (o reader é reaproveitado no fallback)
+            is_valid, validation_msg, reader, original_size = PDFCompressor.load_pdf(input_path)
             if not is_valid:
-                return False, f"PDF inválido: {validation_msg}", {}
+                return False, f"PDF inválido: {validation_msg}", None
             
-            original_size = PDFCompressor.get_file_size(input_path)
+            # PDF abaixo do limite mínimo: devolver o original
+            if original_size < MIN_COMPRESS_BYTES:
+                link_or_copy(input_path, output_path)
+                stats = PDFCompressor.build_stats(original_size, original_size, 'Original (abaixo do limite)')
+                
+                return True, "PDF pequeno, nenhuma compressão necessária", stats
+            
+            # PDF pequeno e já otimizado (object streams ou gerado pelo Ghostscript):
+            # devolver o original sem reprocessar
+            if original_size < ALREADY_OPTIMIZED_MAX_SIZE and (
+                    PDFCompressor.has_object_streams(input_path) or PDFCompressor.produced_by_ghostscript(reader)):
+                link_or_copy(input_path, output_path)
+                stats = PDFCompressor.build_stats(original_size, original_size, 'Original (já otimizado)')
+                
+                return True, "PDF já otimizado, nenhuma compressão necessária", stats
+            
+            # Ghostscript não instalado: usar qpdf/PyPDF diretamente
+            if _GS_PATH is None:
+                success, msg, backend = PDFCompressor.fallback_compression(input_path, output_path, level=6, reader=reader)
+                if success:
+                    stats = PDFCompressor.result_stats(input_path, output_path, original_size, PDFCompressor.get_file_size(output_path), f'{backend} (Ghostscript não disponível)')
+                    
+                    return True, f"Compressão otimizada realizada ({backend})", stats
+                else:
+                    return False, f"Falha na compressão: {msg}", None
             
             # Tentar usar Ghostscript primeiro
             try:
-                cmd = [
-                    'gs',
-                    '-sDEVICE=pdfwrite',
-                    '-dCompatibilityLevel=1.4',
-                    '-dPDFSETTINGS=/ebook',
-                    '-dNOPAUSE',
-                    '-dQUIET',
-                    '-dBATCH',
-                    '-dColorImageResolution=150',
-                    '-dGrayImageResolution=150',
-                    '-dMonoImageResolution=300',
-                    '-sOutputFile=' + output_path,
-                    input_path
-                ]
+                result = PDFCompressor.run_ghostscript_checkpointed(_GS_OPTIMIZED_ARGS, input_path, output_path, reader, 'optimized')
+                compressed_size = PDFCompressor.output_size(output_path)
                 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-                
-                if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                    compressed_size = PDFCompressor.get_file_size(output_path)
-                    reduction = ((original_size - compressed_size) / original_size) * 100
-                    
-                    stats = {
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'reduction_percentage': round(reduction, 1),
-                        'method': 'Ghostscript Otimizado'
-                    }
+                if result.returncode == 0 and compressed_size > 0:
+                    stats = PDFCompressor.result_stats(input_path, output_path, original_size, compressed_size, 'Ghostscript Otimizado')
                     
                     return True, "Compressão otimizada realizada com sucesso", stats
                 else:
-                    # Fallback para PyPDF
-                    success, msg = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=6)
+                    if result.stderr:
+                        stderr = result.stderr.decode('utf-8', errors='replace').strip()
+                        print(f"Ghostscript falhou ({result.returncode}): {PDFCompressor.sanitize_text(stderr)}")
+                    
+                    # Fallback para qpdf/PyPDF
+                    success, msg, backend = PDFCompressor.fallback_compression(input_path, output_path, level=6, reader=reader)
                     if success:
-                        compressed_size = PDFCompressor.get_file_size(output_path)
-                        reduction = ((original_size - compressed_size) / original_size) * 100
-                        
-                        stats = {
-                            'original_size': original_size,
-                            'compressed_size': compressed_size,
-                            'reduction_percentage': round(reduction, 1),
-                            'method': 'PyPDF Fallback'
-                        }
+                        stats = PDFCompressor.result_stats(input_path, output_path, original_size, PDFCompressor.get_file_size(output_path), f'{backend} Fallback')
                         
                         return True, "Compressão otimizada realizada (fallback)", stats
                     else:
-                        return False, f"Falha na compressão: {msg}", {}
+                        return False, f"Falha na compressão: {msg}", None
                         
             except subprocess.TimeoutExpired:
-                return False, "Timeout na compressão - arquivo muito grande", {}
-            except FileNotFoundError:
-                # Ghostscript não instalado, usar PyPDF
-                success, msg = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=6)
-                if success:
-                    compressed_size = PDFCompressor.get_file_size(output_path)
-                    reduction = ((original_size - compressed_size) / original_size) * 100
-                    
-                    stats = {
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'reduction_percentage': round(reduction, 1),
-                        'method': 'PyPDF (Ghostscript não disponível)'
-                    }
-                    
-                    return True, "Compressão otimizada realizada (PyPDF)", stats
-                else:
-                    return False, f"Falha na compressão: {msg}", {}
+                return False, "Timeout na compressão - arquivo muito grande", None
                     
         except Exception as e:
-            return False, f"Erro inesperado na compressão otimizada: {str(e)}", {}
+            return False, f"Erro inesperado na compressão otimizada: {str(e)}", None
     
     @staticmethod
-    def compress_pdf_maximum(input_path: str, output_path: str) -> Tuple[bool, str, dict]:
+    def compress_pdf_maximum(input_path: str, output_path: str) -> Tuple[bool, str, Optional[CompressionStats]]:
         """
         Compressão máxima: Usa Ghostscript com configurações agressivas
         Máxima redução de tamanho com qualidade aceitável
         """
         try:
-            # Validar PDF de entrada
-            is_valid, validation_msg = PDFCompressor.validate_pdf(input_path)
+            # Validar PDF de entrada (o reader é reaproveitado no fallback)
+            is_valid, validation_msg, reader, original_size = PDFCompressor.load_pdf(input_path)
             if not is_valid:
-                return False, f"PDF inválido: {validation_msg}", {}
+                return False, f"PDF inválido: {validation_msg}", None
             
-            original_size = PDFCompressor.get_file_size(input_path)
+            # PDF abaixo do limite mínimo: devolver o original
+            if original_size < MIN_COMPRESS_BYTES:
+                link_or_copy(input_path, output_path)
+                stats = PDFCompressor.build_stats(original_size, original_size, 'Original (abaixo do limite)')
+                
+                return True, "PDF pequeno, nenhuma compressão necessária", stats
+            
+            # Ghostscript não instalado: usar qpdf/PyPDF diretamente
+            if _GS_PATH is None:
+                success, msg, backend = PDFCompressor.fallback_compression(input_path, output_path, level=9, reader=reader)
+                if success:
+                    stats = PDFCompressor.result_stats(input_path, output_path, original_size, PDFCompressor.get_file_size(output_path), f'{backend} (Ghostscript não disponível)')
+                    
+                    return True, f"Compressão máxima realizada ({backend})", stats
+                else:
+                    return False, f"Falha na compressão: {msg}", None
             
             # Tentar usar Ghostscript primeiro
             try:
-                cmd = [
-                    'gs',
-                    '-sDEVICE=pdfwrite',
-                    '-dCompatibilityLevel=1.4',
-                    '-dPDFSETTINGS=/screen',
-                    '-dNOPAUSE',
-                    '-dQUIET',
-                    '-dBATCH',
-                    '-dColorImageResolution=36',
-                    '-dGrayImageResolution=36',
-                    '-dMonoImageResolution=36',
-                    '-sOutputFile=' + output_path,
-                    input_path
-                ]
+                result = PDFCompressor.run_ghostscript_checkpointed(_GS_MAXIMUM_ARGS, input_path, output_path, reader, 'maximum')
+                compressed_size = PDFCompressor.output_size(output_path)
                 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-                
-                if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                    compressed_size = PDFCompressor.get_file_size(output_path)
-                    reduction = ((original_size - compressed_size) / original_size) * 100
-                    
-                    stats = {
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'reduction_percentage': round(reduction, 1),
-                        'method': 'Ghostscript Máximo'
-                    }
+                if result.returncode == 0 and compressed_size > 0:
+                    stats = PDFCompressor.result_stats(input_path, output_path, original_size, compressed_size, 'Ghostscript Máximo')
                     
                     return True, "Compressão máxima realizada com sucesso", stats
                 else:
-                    # Fallback para PyPDF
-                    success, msg = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=9)
+                    if result.stderr:
+                        stderr = result.stderr.decode('utf-8', errors='replace').strip()
+                        print(f"Ghostscript falhou ({result.returncode}): {PDFCompressor.sanitize_text(stderr)}")
+                    
+                    # Fallback para qpdf/PyPDF
+                    success, msg, backend = PDFCompressor.fallback_compression(input_path, output_path, level=9, reader=reader)
                     if success:
-                        compressed_size = PDFCompressor.get_file_size(output_path)
-                        reduction = ((original_size - compressed_size) / original_size) * 100
-                        
-                        stats = {
-                            'original_size': original_size,
-                            'compressed_size': compressed_size,
-                            'reduction_percentage': round(reduction, 1),
-                            'method': 'PyPDF Fallback'
-                        }
+                        stats = PDFCompressor.result_stats(input_path, output_path, original_size, PDFCompressor.get_file_size(output_path), f'{backend} Fallback')
                         
                         return True, "Compressão máxima realizada (fallback)", stats
                     else:
-                        return False, f"Falha na compressão: {msg}", {}
+                        return False, f"Falha na compressão: {msg}", None
                         
             except subprocess.TimeoutExpired:
-                return False, "Timeout na compressão - arquivo muito grande", {}
-            except FileNotFoundError:
-                # Ghostscript não instalado, usar PyPDF
-                success, msg = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=9)
-                if success:
-                    compressed_size = PDFCompressor.get_file_size(output_path)
-                    reduction = ((original_size - compressed_size) / original_size) * 100
-                    
-                    stats = {
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'reduction_percentage': round(reduction, 1),
-                        'method': 'PyPDF (Ghostscript não disponível)'
-                    }
-                    
-                    return True, "Compressão máxima realizada (PyPDF)", stats
-                else:
-                    return False, f"Falha na compressão: {msg}", {}
+                return False, "Timeout na compressão - arquivo muito grande", None
                     
         except Exception as e:
-            return False, f"Erro inesperado na compressão máxima: {str(e)}", {}
+            return False, f"Erro inesperado na compressão máxima: {str(e)}", None
     
     @staticmethod
-    def compress_pdf(input_path: str, compression_type: str) -> Tuple[bool, str, dict, str]:
+    def compress_pdf(input_path: str, compression_type: str) -> Tuple[bool, str, Optional[CompressionStats], str]:
         """Função principal de compressão que chama a função específica baseada no tipo"""
         try:
-            # Validar arquivo de entrada
-            is_valid, validation_msg = PDFCompressor.validate_pdf(input_path)
-            if not is_valid:
-                return False, validation_msg, {}, ""
-            
-            # Criar arquivo de saída temporário
-            output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf').name
-            
-            # Chamar função específica baseada no tipo
+            # Selecionar função específica baseada no tipo
+            # (a validação do PDF acontece dentro dela, com um único parse)
             if compression_type == 'optimized':
-                success, message, stats = PDFCompressor.compress_pdf_optimized(input_path, output_path)
+                compress = PDFCompressor.compress_pdf_optimized
             elif compression_type == 'maximum':
-                success, message, stats = PDFCompressor.compress_pdf_maximum(input_path, output_path)
+                compress = PDFCompressor.compress_pdf_maximum
             else:
-                return False, f"Tipo de compressão inválido: {compression_type}", {}, ""
+                return False, f"Tipo de compressão inválido: {compression_type}", None, ""
+            
+            # Criar arquivo de saída temporário no mesmo diretório (e sistema de arquivos)
+            # da entrada, permitindo hardlinks em vez de cópias
+            fd, output_path = tempfile.mkstemp(suffix='.pdf', dir=os.path.dirname(input_path))
+            os.close(fd)
+            
+            # Reaproveitar o resultado de um upload idêntico, se houver cache
+            cache_key = None
+            if compression_cache.cache_enabled():
+                cache_key = compression_cache.cache_key(input_path, compression_type)
+                cached = compression_cache.lookup(cache_key, output_path)
+                if cached is not None:
+                    message, stats = cached
+                    return True, message, stats, output_path
+            
+            success, message, stats = compress(input_path, output_path)
             
             if success:
+                if cache_key is not None:
+                    compression_cache.store(cache_key, output_path, message, stats)
                 return True, message, stats, output_path
             else:
                 # Limpar arquivo de saída em caso de erro
@@ -294,4 +780,23 @@ class PDFCompressor:
                 return False, message, stats, ""
                 
         except Exception as e:
-            return False, f"Erro na compressão: {str(e)}", {}, ""
+            return False, f"Erro na compressão: {str(e)}", None, ""
+    
+    @staticmethod
+    def compress_batch(input_paths: List[str], compression_type: str) -> List[Tuple[bool, str, Optional[CompressionStats], str]]:
+        """
+        Comprime vários PDFs em paralelo, um arquivo por processo do pool
+        
+        O pdfwrite do Ghostscript é single-thread, então o paralelismo é feito por
+        arquivo. Os resultados seguem a ordem de input_paths.
+        """
+        pool = get_process_pool()
+        futures = [pool.submit(PDFCompressor.compress_pdf, path, compression_type) for path in input_paths]
+        
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append((False, f"Erro na compressão: {str(e)}", None, ""))
+        return results
@@ -1,11 +1,101 @@
+import gc
+import io
 import os
 import tempfile
 from typing import List, Tuple
 from pypdf import PdfWriter, PdfReader
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4, landscape, portrait
+from pypdf.generic import DecodedStreamObject, DictionaryObject, EncodedStreamObject, NameObject, NumberObject
 from PIL import Image
-import re
+from src.utils.pool import get_process_pool
+from src.utils.text import format_file_size
+
+try:
+    # qpdf (C++): mesclagem com bem menos memória por página e serialização mais rápida
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    pikepdf = None
+    PIKEPDF_AVAILABLE = False
+
+# Backend da mesclagem: 'pypdf' (padrão) ou 'pikepdf' (opcional, quando instalado).
+# O pikepdf usa menos memória em mesclagens grandes, mas não deduplica objetos
+# idênticos entre os arquivos como o compress_identical_objects do pypdf
+MERGE_BACKEND = os.environ.get('PDF_MERGE_BACKEND', 'pypdf').lower()
+
+# Buffer de escrita do PDF mesclado: agrupa as muitas escritas pequenas do pypdf
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Na mesclagem via pypdf, coleta de ciclos a cada tantos arquivos
+GC_INTERVAL_FILES = 25
+
+# Página A4 em pontos (retrato); imagens paisagem usam a página deitada
+A4_SIZE = (595.2755905511812, 841.8897637795277)
+
+# Abaixo deste tamanho total a validação roda no próprio processo: o custo de
+# IPC do pool supera o parse de poucos arquivos pequenos
+VALIDATE_POOL_MIN_BYTES = 32 * 1024 * 1024  # 32MB
+
+# Extensões aceitas na mesclagem
+SUPPORTED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+
+# Formatos do Pillow aceitos na validação de imagens
+IMAGE_FORMATS = ('PNG', 'JPEG')
+
+# Maior imagem embutida (A4 a 300 DPI, retrato); imagens maiores são reduzidas
+MAX_IMAGE_SIZE = (2480, 3508)
+
+# Qualidade do JPEG embutido no PDF para cada imagem (croma 4:2:0, sem passe de otimização)
+JPEG_QUALITY = 90
+
+def _encode_image(image_path: str) -> Tuple[bool, object]:
+    """
+    Prepara uma imagem para a mesclagem (executado nos processos do pool)
+    
+    Returns:
+        Tuple[bool, object]: (sucesso, (jpeg, largura, altura, espaço de cor) ou mensagem de erro)
+    """
+    try:
+        return True, PDFMerger.encode_image(image_path)
+    except Exception as e:
+        return False, str(e)
+
+def _validate_one(file_path: str) -> Tuple[bool, str]:
+    """
+    Valida um único arquivo PDF ou imagem (executado nos processos do pool)
+    
+    Returns:
+        Tuple[bool, str]: (válido, mensagem de erro se houver)
+    """
+    if not os.path.exists(file_path):
+        return False, f"Arquivo não encontrado: {os.path.basename(file_path)}"
+    
+    # Verificar extensão
+    _, ext = os.path.splitext(file_path.lower())
+    if ext not in SUPPORTED_EXTENSIONS:
+        return False, f"Tipo de arquivo não suportado: {os.path.basename(file_path)} (suportados: PDF, PNG, JPG)"
+    
+    file_type = PDFMerger.get_file_type(file_path)
+    
+    if file_type == 'pdf':
+        # Validar PDF
+        try:
+            reader = PdfReader(file_path)
+            if len(reader.pages) == 0:
+                return False, f"PDF vazio: {os.path.basename(file_path)}"
+        except Exception as e:
+            return False, f"PDF inválido: {os.path.basename(file_path)} - {str(e)}"
+    
+    elif file_type == 'image':
+        # Validar imagem pelo cabeçalho (formato, dimensões e modo), sem decodificar
+        # os pixels; a decodificação completa acontece na mesclagem
+        try:
+            with Image.open(file_path, formats=IMAGE_FORMATS) as img:
+                if img.width <= 0 or img.height <= 0 or not img.mode:
+                    raise ValueError("dimensões ou modo de cor inválidos")
+        except Exception as e:
+            return False, f"Imagem inválida: {os.path.basename(file_path)} - {str(e)}"
+    
+    return True, ""
 
 class PDFMerger:
     """
@@ -14,23 +104,15 @@ class PDFMerger:
     
     @staticmethod
     def sanitize_text(text: str) -> str:
-        """Remove caracteres UTF-8 inválidos"""
-        return re.sub(r'[^\x00-\x7F]+', '?', str(text))
+        """Substitui caracteres não ASCII por '?'"""
+        return str(text).encode('ascii', errors='replace').decode('ascii')
     
     @staticmethod
     def get_file_size(file_path: str) -> int:
         """Retorna o tamanho do arquivo em bytes"""
         return os.path.getsize(file_path)
     
-    @staticmethod
-    def format_file_size(size_bytes: int) -> str:
-        """Formata o tamanho do arquivo para exibição"""
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.1f} KB"
-        else:
-            return f"{size_bytes / (1024 * 1024):.1f} MB"
+    format_file_size = staticmethod(format_file_size)
     
     @staticmethod
     def get_file_type(file_path: str) -> str:
@@ -43,6 +125,189 @@ class PDFMerger:
         else:
             return 'unknown'
     
+    @staticmethod
+    def encode_image(image_path: str) -> Tuple[bytes, int, int, str]:
+        """
+        Obtém a imagem PNG/JPG como JPEG em memória
+        
+        JPEGs RGB ou em tons de cinza que cabem em MAX_IMAGE_SIZE são embutidos com
+        os bytes originais; as demais imagens são reduzidas (se necessário) e
+        recodificadas como JPEG RGB.
+        
+        Args:
+            image_path: Caminho da imagem
+            
+        Returns:
+            Tuple[bytes, int, int, str]: (dados JPEG, largura, altura, espaço de cor)
+        """
+        with Image.open(image_path) as img:
+            # Limite na mesma orientação da imagem
+            max_size = MAX_IMAGE_SIZE if img.width <= img.height else MAX_IMAGE_SIZE[::-1]
+            fits = img.width <= max_size[0] and img.height <= max_size[1]
+            
+            # JPEG já compatível com /DCTDecode: sem recodificar
+            if fits and img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+                with open(image_path, 'rb') as f:
+                    data = f.read()
+                return data, img.width, img.height, '/DeviceRGB' if img.mode == 'RGB' else '/DeviceGray'
+            
+            # JPEG grande: decodificar direto em escala reduzida (1/2, 1/4 ou 1/8)
+            if not fits:
+                img.draft(img.mode, max_size)
+            
+            # Converter para RGB se necessário (PNG pode ter transparência)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Criar fundo branco
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                if img.mode == 'P':
+                    img = img.convert('RGBA')
+                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            if not fits:
+                img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=False, subsampling='4:2:0')
+            return buffer.getvalue(), img.width, img.height, '/DeviceRGB'
+    
+    @staticmethod
+    def image_page_layout(img_width: int, img_height: int) -> Tuple[float, float, bytes]:
+        """
+        Calcula a página A4 e o content stream que desenha a imagem (/Im0)
+        
+        A orientação da página segue a da imagem, que é centralizada ocupando
+        90% da página e mantendo a proporção.
+        
+        Returns:
+            Tuple[float, float, bytes]: (largura da página, altura da página, content stream)
+        """
+        # Imagem paisagem -> página paisagem
+        if img_width > img_height:
+            page_width, page_height = A4_SIZE[1], A4_SIZE[0]
+        else:
+            page_width, page_height = A4_SIZE
+        
+        # Calcular escala, dimensões finais e posição para centralizar
+        scale = min(page_width / img_width, page_height / img_height) * 0.9  # 90% da página para margem
+        final_width = img_width * scale
+        final_height = img_height * scale
+        x = (page_width - final_width) / 2
+        y = (page_height - final_height) / 2
+        
+        content = f"q {final_width:.4f} 0 0 {final_height:.4f} {x:.4f} {y:.4f} cm /Im0 Do Q".encode()
+        return page_width, page_height, content
+    
+    @staticmethod
+    def add_image_page(writer: PdfWriter, jpeg_data: bytes, img_width: int, img_height: int,
+                       color_space: str = '/DeviceRGB') -> None:
+        """Adiciona ao writer uma página A4 com o JPEG embutido diretamente (/DCTDecode)"""
+        page_width, page_height, content_data = PDFMerger.image_page_layout(img_width, img_height)
+        
+        # XObject de imagem com os bytes do JPEG, sem recodificação
+        image = EncodedStreamObject()
+        image[NameObject('/Type')] = NameObject('/XObject')
+        image[NameObject('/Subtype')] = NameObject('/Image')
+        image[NameObject('/Width')] = NumberObject(img_width)
+        image[NameObject('/Height')] = NumberObject(img_height)
+        image[NameObject('/ColorSpace')] = NameObject(color_space)
+        image[NameObject('/BitsPerComponent')] = NumberObject(8)
+        image[NameObject('/Filter')] = NameObject('/DCTDecode')
+        image._data = jpeg_data
+        
+        page = writer.add_blank_page(page_width, page_height)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): writer._add_object(image)})
+        })
+        
+        content = DecodedStreamObject()
+        content.set_data(content_data)
+        page.replace_contents(content)
+    
+    @staticmethod
+    def add_image_page_pikepdf(pdf, jpeg_data: bytes, img_width: int, img_height: int,
+                               color_space: str = '/DeviceRGB') -> None:
+        """Equivalente de add_image_page para um pikepdf.Pdf"""
+        page_width, page_height, content_data = PDFMerger.image_page_layout(img_width, img_height)
+        
+        image = pikepdf.Stream(pdf, jpeg_data)
+        image.Type = pikepdf.Name.XObject
+        image.Subtype = pikepdf.Name.Image
+        image.Width = img_width
+        image.Height = img_height
+        image.ColorSpace = pikepdf.Name(color_space)
+        image.BitsPerComponent = 8
+        image.Filter = pikepdf.Name.DCTDecode
+        
+        page = pikepdf.Dictionary(
+            Type=pikepdf.Name.Page,
+            MediaBox=[0, 0, page_width, page_height],
+            Resources=pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image)),
+            Contents=pikepdf.Stream(pdf, content_data)
+        )
+        pdf.pages.append(pikepdf.Page(page))
+    
+    @staticmethod
+    def merge_with_pikepdf(input_files: List[str], output_path: str, file_sizes: dict,
+                           encoded: dict) -> Tuple[int, list]:
+        """
+        Mescla os arquivos com o pikepdf (qpdf), gravando a saída com object streams
+        
+        Recebe as imagens já convertidas com sucesso. Levanta exceção em caso de erro
+        em um PDF; merge_files então refaz a mesclagem com o pypdf, que reporta o
+        arquivo com problema.
+        
+        Returns:
+            Tuple[int, list]: (total de páginas, informações de cada arquivo)
+        """
+        total_pages = 0
+        file_info = []
+        sources = []
+        
+        try:
+            with pikepdf.Pdf.new() as out:
+                for file_path in input_files:
+                    file_name = os.path.basename(file_path)
+                    
+                    if PDFMerger.get_file_type(file_path) == 'pdf':
+                        # As páginas copiadas referenciam o PDF de origem até o save
+                        src = pikepdf.open(file_path)
+                        sources.append(src)
+                        num_pages = len(src.pages)
+                        out.pages.extend(src.pages)
+                        file_type = 'PDF'
+                    else:
+                        _, result = encoded[file_path]
+                        PDFMerger.add_image_page_pikepdf(out, *result)
+                        num_pages = 1
+                        file_type = 'Imagem (convertida)'
+                    
+                    total_pages += num_pages
+                    file_info.append({
+                        'name': file_name,
+                        'type': file_type,
+                        'size': file_sizes[file_path],
+                        'pages': num_pages
+                    })
+                
+                # Mesma publicação atômica do caminho pypdf
+                fd, partial_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(output_path))
+                try:
+                    with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as output_file:
+                        out.save(output_file, linearize=False,
+                                 object_stream_mode=pikepdf.ObjectStreamMode.generate)
+                    os.replace(partial_path, output_path)
+                except Exception:
+                    os.unlink(partial_path)
+                    raise
+        finally:
+            for src in sources:
+                src.close()
+        
+        return total_pages, file_info
+    
     @staticmethod
     def convert_image_to_pdf(image_path: str, output_path: str) -> Tuple[bool, str]:
         """
@@ -56,69 +321,15 @@ class PDFMerger:
             Tuple[bool, str]: (sucesso, mensagem)
         """
         try:
-            # Abrir imagem
-            with Image.open(image_path) as img:
-                # Converter para RGB se necessário (PNG pode ter transparência)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Criar fundo branco
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Obter dimensões da imagem
-                img_width, img_height = img.size
-                
-                # Detectar orientação da imagem e ajustar página
-                is_landscape = img_width > img_height
-                
-                if is_landscape:
-                    # Imagem paisagem -> página paisagem
-                    page_width, page_height = A4[1], A4[0]  # Inverter dimensões (842 x 595)
-                    pagesize = landscape(A4)
-                else:
-                    # Imagem retrato -> página retrato
-                    page_width, page_height = A4  # Manter dimensões (595 x 842)
-                    pagesize = portrait(A4)
-                
-                # Calcular escala para ajustar a imagem na página mantendo proporção
-                scale_x = page_width / img_width
-                scale_y = page_height / img_height
-                scale = min(scale_x, scale_y) * 0.9  # 90% da página para margem
-                
-                # Calcular dimensões finais
-                final_width = img_width * scale
-                final_height = img_height * scale
-                
-                # Calcular posição para centralizar
-                x = (page_width - final_width) / 2
-                y = (page_height - final_height) / 2
-                
-                # Criar PDF com orientação correta
-                c = canvas.Canvas(output_path, pagesize=pagesize)
-                
-                # Salvar imagem temporariamente como JPEG para reportlab
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
-                    img.save(temp_img.name, 'JPEG', quality=95)
-                    temp_img_path = temp_img.name
-                
-                try:
-                    # Adicionar imagem ao PDF
-                    c.drawImage(temp_img_path, x, y, width=final_width, height=final_height)
-                    c.save()
-                    
-                    return True, "Imagem convertida para PDF com sucesso"
-                    
-                finally:
-                    # Limpar arquivo temporário
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
+            writer = PdfWriter()
+            PDFMerger.add_image_page(writer, *PDFMerger.encode_image(image_path))
+            with open(output_path, 'wb') as output_file:
+                writer.write(output_file)
+            
+            return True, "Imagem convertida para PDF com sucesso"
                         
         except Exception as e:
-            return False, f"Erro ao converter imagem: {str(e)}"
+            return False, str(e)
     
     @staticmethod
     def merge_files(input_files: List[str], output_path: str) -> Tuple[bool, str, dict]:
@@ -139,13 +350,36 @@ class PDFMerger:
             if len(input_files) < 2:
                 return False, "É necessário pelo menos 2 arquivos para mesclagem", {}
             
-            # Verificar se todos os arquivos existem
+            # Verificar se todos os arquivos existem e obter os tamanhos com um único stat
+            # (dicionário local da chamada: caminhos temporários são reutilizados)
+            file_sizes = {}
             for file_path in input_files:
-                if not os.path.exists(file_path):
+                try:
+                    file_sizes[file_path] = os.stat(file_path).st_size
+                except FileNotFoundError:
                     return False, f"Arquivo não encontrado: {os.path.basename(file_path)}", {}
             
             # Calcular tamanho total dos arquivos de entrada
-            total_input_size = sum(PDFMerger.get_file_size(file_path) for file_path in input_files)
+            total_input_size = sum(file_sizes[file_path] for file_path in input_files)
+            
+            # Codificar as imagens antes da mesclagem, em paralelo quando houver mais de uma
+            image_paths = [file_path for file_path in input_files if PDFMerger.get_file_type(file_path) == 'image']
+            mapper = get_process_pool().map if len(image_paths) > 1 else map
+            encoded = dict(zip(image_paths, mapper(_encode_image, image_paths)))
+            
+            # Imagem que não pôde ser convertida: falhar antes de montar o PDF em qualquer backend
+            # (erro do arquivo enviado, sinalizado em 'invalid_file' para a rota responder 400)
+            for image_path, (success, result) in encoded.items():
+                if not success:
+                    file_name = os.path.basename(image_path)
+                    return False, f"Imagem inválida: {file_name} - {result}", {'invalid_file': file_name}
+            
+            if MERGE_BACKEND == 'pikepdf' and PIKEPDF_AVAILABLE:
+                try:
+                    total_pages, file_info = PDFMerger.merge_with_pikepdf(input_files, output_path, file_sizes, encoded)
+                    return PDFMerger.merge_result(input_files, output_path, total_input_size, total_pages, file_info)
+                except Exception as e:
+                    print(f"Mesclagem via pikepdf falhou, usando pypdf: {PDFMerger.sanitize_text(str(e))}")
             
             # Criar writer para o PDF mesclado
             writer = PdfWriter()
@@ -153,23 +387,24 @@ class PDFMerger:
             # Contador de páginas
             total_pages = 0
             file_info = []
-            temp_files = []  # Para limpar arquivos temporários
             
             # Processar cada arquivo
             for i, file_path in enumerate(input_files):
                 try:
                     file_type = PDFMerger.get_file_type(file_path)
                     file_name = os.path.basename(file_path)
-                    file_size = PDFMerger.get_file_size(file_path)
+                    file_size = file_sizes[file_path]
                     
                     if file_type == 'pdf':
-                        # Processar PDF
-                        reader = PdfReader(file_path)
-                        num_pages = len(reader.pages)
-                        
-                        # Adicionar todas as páginas ao writer
-                        for page in reader.pages:
-                            writer.add_page(page)
+                        # Anexar o PDF inteiro (mantém recursos compartilhados entre páginas),
+                        # lendo direto do arquivo: com um caminho o pypdf copia tudo para memória.
+                        # Sem marcadores (outline), como no caminho pikepdf
+                        pages_before = len(writer.pages)
+                        with open(file_path, 'rb') as f:
+                            reader = PdfReader(f, strict=False)
+                            writer.append(reader, import_outline=False)
+                        reader = None
+                        num_pages = len(writer.pages) - pages_before
                         
                         total_pages += num_pages
                         
@@ -181,29 +416,18 @@ class PDFMerger:
                         })
                         
                     elif file_type == 'image':
-                        # Converter imagem para PDF temporário
-                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-                            temp_pdf_path = temp_pdf.name
-                            temp_files.append(temp_pdf_path)
+                        # Imagem já codificada: montar a página direto no writer
+                        _, result = encoded[file_path]
+                        PDFMerger.add_image_page(writer, *result)
                         
-                        success, msg = PDFMerger.convert_image_to_pdf(file_path, temp_pdf_path)
+                        total_pages += 1  # Imagem = 1 página
                         
-                        if success:
-                            # Ler PDF temporário e adicionar ao writer
-                            reader = PdfReader(temp_pdf_path)
-                            for page in reader.pages:
-                                writer.add_page(page)
-                            
-                            total_pages += 1  # Imagem = 1 página
-                            
-                            file_info.append({
-                                'name': file_name,
-                                'type': 'Imagem (convertida)',
-                                'size': file_size,
-                                'pages': 1
-                            })
-                        else:
-                            return False, f"Erro ao converter {file_name}: {msg}", {}
+                        file_info.append({
+                            'name': file_name,
+                            'type': 'Imagem (convertida)',
+                            'size': file_size,
+                            'pages': 1
+                        })
                     
                     else:
                         return False, f"Tipo de arquivo não suportado: {file_name}", {}
@@ -211,45 +435,63 @@ class PDFMerger:
                 except Exception as e:
                     error_msg = PDFMerger.sanitize_text(str(e))
                     return False, f"Erro ao processar {os.path.basename(file_path)}: {error_msg}", {}
+                
+                # Liberar os grafos de objetos dos PDFs já anexados
+                if (i + 1) % GC_INTERVAL_FILES == 0:
+                    gc.collect()
             
-            # Salvar arquivo mesclado
-            with open(output_path, 'wb') as output_file:
-                writer.write(output_file)
+            # Deduplicar imagens/fontes idênticas vindas de arquivos diferentes
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
             
-            # Limpar arquivos temporários
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except:
-                    pass
+            # Salvar arquivo mesclado em um temporário no mesmo diretório e
+            # publicá-lo com os.replace, sem deixar saída parcial em caso de erro
+            fd, partial_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(output_path))
+            try:
+                with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as output_file:
+                    writer.write(output_file)
+                os.replace(partial_path, output_path)
+            except Exception:
+                os.unlink(partial_path)
+                raise
             
-            # Calcular tamanho do arquivo de saída
-            output_size = PDFMerger.get_file_size(output_path)
+            # Liberar o grafo de objetos antes de calcular as estatísticas
+            writer.close()
             
-            # Preparar estatísticas
-            stats = {
-                'total_files': len(input_files),
-                'total_input_size': total_input_size,
-                'output_size': output_size,
-                'total_pages': total_pages,
-                'total_input_size_formatted': PDFMerger.format_file_size(total_input_size),
-                'output_size_formatted': PDFMerger.format_file_size(output_size),
-                'file_info': file_info,
-                'compression_ratio': ((total_input_size - output_size) / total_input_size) * 100 if total_input_size > 0 else 0
-            }
-            
-            return True, f"Mesclagem realizada com sucesso! {len(input_files)} arquivos mesclados em {total_pages} páginas.", stats
+            return PDFMerger.merge_result(input_files, output_path, total_input_size, total_pages, file_info)
             
         except Exception as e:
             error_msg = PDFMerger.sanitize_text(str(e))
             return False, f"Erro na mesclagem: {error_msg}", {}
     
+    @staticmethod
+    def merge_result(input_files: List[str], output_path: str, total_input_size: int,
+                     total_pages: int, file_info: list) -> Tuple[bool, str, dict]:
+        """Monta o retorno de merge_files a partir do PDF gravado"""
+        # Calcular tamanho do arquivo de saída
+        output_size = PDFMerger.get_file_size(output_path)
+        
+        # Preparar estatísticas
+        stats = {
+            'total_files': len(input_files),
+            'total_input_size': total_input_size,
+            'output_size': output_size,
+            'total_pages': total_pages,
+            'total_input_size_formatted': PDFMerger.format_file_size(total_input_size),
+            'output_size_formatted': PDFMerger.format_file_size(output_size),
+            'file_info': file_info,
+            'compression_ratio': ((total_input_size - output_size) / total_input_size) * 100 if total_input_size > 0 else 0
+        }
+        
+        return True, f"Mesclagem realizada com sucesso! {len(input_files)} arquivos mesclados em {total_pages} páginas.", stats
+    
     @staticmethod
     def validate_files(file_paths: List[str]) -> Tuple[bool, str]:
         """
         Valida se todos os arquivos são PDFs ou imagens válidas
         
+        Com mais de um arquivo e ao menos VALIDATE_POOL_MIN_BYTES no total a
+        validação roda em paralelo no pool de processos.
+        
         Args:
             file_paths: Lista de caminhos dos arquivos
             
@@ -257,36 +499,22 @@ class PDFMerger:
             Tuple[bool, str]: (válido, mensagem de erro se houver)
         """
         try:
-            supported_types = ['.pdf', '.png', '.jpg', '.jpeg']
-            
+            total_size = 0
             for file_path in file_paths:
-                if not os.path.exists(file_path):
-                    return False, f"Arquivo não encontrado: {os.path.basename(file_path)}"
-                
-                # Verificar extensão
-                _, ext = os.path.splitext(file_path.lower())
-                if ext not in supported_types:
-                    return False, f"Tipo de arquivo não suportado: {os.path.basename(file_path)} (suportados: PDF, PNG, JPG)"
-                
-                file_type = PDFMerger.get_file_type(file_path)
-                
-                if file_type == 'pdf':
-                    # Validar PDF
-                    try:
-                        reader = PdfReader(file_path)
-                        if len(reader.pages) == 0:
-                            return False, f"PDF vazio: {os.path.basename(file_path)}"
-                    except Exception as e:
-                        return False, f"PDF inválido: {os.path.basename(file_path)} - {str(e)}"
-                
-                elif file_type == 'image':
-                    # Validar imagem
-                    try:
-                        with Image.open(file_path) as img:
-                            # Verificar se a imagem pode ser aberta
-                            img.verify()
-                    except Exception as e:
-                        return False, f"Imagem inválida: {os.path.basename(file_path)} - {str(e)}"
+                try:
+                    total_size += os.stat(file_path).st_size
+                except OSError:
+                    pass
+            
+            if len(file_paths) > 1 and total_size >= VALIDATE_POOL_MIN_BYTES:
+                results = get_process_pool().map(_validate_one, file_paths)
+            else:
+                results = map(_validate_one, file_paths)
+            
+            # Resultados na ordem dos arquivos: reportar a primeira falha
+            for is_valid, message in results:
+                if not is_valid:
+                    return False, message
             
             return True, "Todos os arquivos são válidos"
             
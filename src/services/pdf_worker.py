@@ -0,0 +1,24 @@
+"""
+Executa a compressão PyPDF em um processo separado
+
+Permite rodar o caminho puro-Python sob outro interpretador (ex.: PyPy),
+configurado via PDF_FALLBACK_PYTHON:
+
+    python -m src.services.pdf_worker <entrada.pdf> <saida.pdf> <nivel>
+"""
+
+import sys
+from src.services.pdf_compressor import PDFCompressor
+
+def main(argv: list) -> int:
+    if len(argv) != 3:
+        print("Uso: python -m src.services.pdf_worker <entrada.pdf> <saida.pdf> <nivel>", file=sys.stderr)
+        return 2
+    
+    input_path, output_path, level = argv
+    success, message = PDFCompressor.fallback_pypdf_compression(input_path, output_path, level=int(level))
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
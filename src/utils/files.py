@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+# Diretório de trabalho para uploads e PDFs gerados (ex.: /dev/shm para manter tudo em RAM)
+SCRATCH_DIR = os.environ.get('PDF_COMPRESSOR_TMPDIR') or tempfile.gettempdir()
+
+# Tamanho dos blocos usados ao copiar uploads para o disco
+COPY_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Assinatura de arquivos PDF: aceita no primeiro 1KB (há geradores que
+# prefixam BOM/espaços), com o marcador %%EOF no último 1KB
+PDF_SIGNATURE = b'%PDF-'
+PDF_HEADER_SCAN_BYTES = 1024
+PDF_TAIL_SCAN_BYTES = 1024
+
+def upload_is_pdf(file) -> bool:
+    """Procura a assinatura %PDF- no início de um upload sem consumi-lo"""
+    head = file.stream.read(PDF_HEADER_SCAN_BYTES)
+    file.stream.seek(0)
+    return PDF_SIGNATURE in head
+
+def is_pdf_file(file_path: str) -> bool:
+    """Verifica a assinatura %PDF- no início e o marcador %%EOF no final do arquivo"""
+    with open(file_path, 'rb') as f:
+        if PDF_SIGNATURE not in f.read(PDF_HEADER_SCAN_BYTES):
+            return False
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - PDF_TAIL_SCAN_BYTES))
+        return b'%%EOF' in f.read()
+
+def save_upload(file, dest_path: str, max_size: int) -> bool:
+    """
+    Grava um upload em disco em blocos, sem carregá-lo inteiro em memória
+
+    Args:
+        file: FileStorage recebido pelo Flask
+        dest_path: Caminho do arquivo de destino
+        max_size: Tamanho máximo permitido em bytes
+
+    Returns:
+        bool: False se o arquivo exceder max_size (o destino é truncado)
+    """
+    written = 0
+    with open(dest_path, 'wb') as out:
+        while True:
+            chunk = file.stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_size:
+                out.truncate(0)
+                return False
+            out.write(chunk)
+    return True
+
+def save_uploads(files: list, dest_paths: List[str], max_size: int) -> List[bool]:
+    """
+    Grava vários uploads em disco em paralelo (a cópia libera o GIL durante o I/O)
+
+    Returns:
+        List[bool]: Para cada arquivo, se ele coube em max_size
+    """
+    with ThreadPoolExecutor(max_workers=max(len(files), 1)) as executor:
+        return list(executor.map(lambda file, path: save_upload(file, path, max_size), files, dest_paths))
+
+def copy_file(src_path: str, dest_path: str) -> None:
+    """Copia um arquivo inteiro dentro do kernel via os.sendfile, sem buffers em Python"""
+    if not hasattr(os, 'sendfile'):
+        shutil.copyfile(src_path, dest_path)
+        return
+    
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dest.fileno(), src.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+def link_or_copy(src_path: str, dest_path: str) -> None:
+    """Disponibiliza src_path em dest_path via hardlink, copiando entre sistemas de arquivos diferentes"""
+    if os.path.exists(dest_path):
+        os.unlink(dest_path)
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        copy_file(src_path, dest_path)
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+from flask import Response, current_app, request, send_file
+
+def static_json_response(payload: dict, max_age: int = 3600):
+    """
+    Pré-serializa uma resposta JSON que não muda durante a execução
+
+    Returns:
+        Função que devolve a resposta com ETag e Cache-Control (304 quando
+        o cliente já possui a versão atual)
+    """
+    body = json.dumps(payload).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    
+    def respond() -> Response:
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response.make_conditional(request)
+    
+    return respond
+
+def send_pdf(file_path: str, download_name: str) -> Response:
+    """
+    Envia um PDF temporário como anexo, removendo-o do disco
+
+    O arquivo é aberto e desvinculado antes do envio: o descritor aberto
+    mantém os dados acessíveis (o servidor WSGI pode usar sendfile) e nada
+    fica para trás no diretório temporário. Com X-Sendfile o caminho
+    precisa continuar existindo para o proxy, e os arquivos enviados devem
+    ser removidos por uma limpeza externa do diretório de trabalho (ver README).
+    """
+    if current_app.config['USE_X_SENDFILE']:
+        return send_file(
+            file_path,
+            as_attachment=True,
+            conditional=True,
+            download_name=download_name,
+            mimetype='application/pdf'
+        )
+    
+    pdf_file = open(file_path, 'rb')
+    os.unlink(file_path)
+    response = send_file(
+        pdf_file,
+        as_attachment=True,
+        conditional=True,
+        download_name=download_name,
+        mimetype='application/pdf'
+    )
+    # O Werkzeug só conhece o tamanho de arquivos passados por caminho
+    response.content_length = os.fstat(pdf_file.fileno()).st_size
+    return response
@@ -0,0 +1,40 @@
+import re
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Caracteres fora do ASCII, escapados como \uXXXX quando ensure_ascii está ativo
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+def _escape_char(match: re.Match) -> str:
+    """Escapa um caractere como o json da biblioteca padrão (par surrogate acima de U+FFFF)"""
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return '\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u%04x' % code
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provider JSON do Flask baseado em orjson (serialização implementada em Rust)
+    
+    Respeita sort_keys e ensure_ascii como o DefaultJSONProvider, então a saída
+    de jsonify não muda ao trocar de provider.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        text = orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+        if kwargs.get('ensure_ascii', self.ensure_ascii) and not text.isascii():
+            text = _NON_ASCII.sub(_escape_char, text)
+        return text
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
@@ -0,0 +1,88 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Processos de cada pool. Com o gunicorn cada worker tem o seu pool, então o
+# total de processos é workers × PDF_POOL_MAX_WORKERS
+POOL_MAX_WORKERS = max(1, int(os.environ.get('PDF_POOL_MAX_WORKERS', min(4, os.cpu_count() or 1))))
+
+# Os workers web são multithread (gthread): o pool não pode usar fork direto do
+# worker, que herdaria locks em uso por outras threads. Com forkserver os
+# processos nascem de um servidor single-thread, que já carrega as bibliotecas pesadas
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    _MP_CONTEXT = multiprocessing.get_context('forkserver')
+    _MP_CONTEXT.set_forkserver_preload(['zlib', 'pypdf', 'PIL.Image'])
+else:
+    _MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# Pool compartilhado por processo, criado no post_fork do gunicorn
+# (gunicorn.conf.py) ou, fora dele, no primeiro uso
+_POOL = None
+_POOL_PID = None
+_POOL_LOCK = threading.Lock()
+
+# Pool de threads para trabalho que libera o GIL (ex.: zlib/ISA-L), sem cópia entre processos
+_THREAD_POOL = None
+_THREAD_POOL_PID = None
+
+# Marcado nos processos do pool: eles executam o trabalho serialmente, sem pools aninhados
+_IN_POOL_WORKER = False
+
+def _preimport():
+    """Importa as bibliotecas pesadas uma única vez em cada processo do pool"""
+    global _IN_POOL_WORKER
+    _IN_POOL_WORKER = True
+    import zlib  # noqa: F401
+    import pypdf  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+def _shutdown_pool():
+    """Encerra os pools ao finalizar o processo que os criou"""
+    if _POOL is not None and _POOL_PID == os.getpid():
+        _POOL.shutdown(wait=False)
+    if _THREAD_POOL is not None and _THREAD_POOL_PID == os.getpid():
+        _THREAD_POOL.shutdown(wait=False)
+
+def in_pool_worker() -> bool:
+    """Indica se o código está rodando dentro de um processo do pool"""
+    return _IN_POOL_WORKER
+
+def _pool_usable(pid: int) -> bool:
+    """Indica se o pool existe, pertence a este processo e não está quebrado"""
+    # Um processo do pool encerrado abruptamente (ex.: OOM kill) quebra o executor
+    # de vez: todo submit seguinte levanta BrokenProcessPool
+    return _POOL is not None and _POOL_PID == pid and not _POOL._broken
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Retorna o pool de processos do processo atual, criando-o (ou recriando-o, se quebrado) quando necessário"""
+    global _POOL, _POOL_PID
+    pid = os.getpid()
+    if not _pool_usable(pid):
+        with _POOL_LOCK:
+            if not _pool_usable(pid):
+                if _POOL is not None and _POOL_PID == pid:
+                    _POOL.shutdown(wait=False, cancel_futures=True)
+                _POOL = ProcessPoolExecutor(max_workers=POOL_MAX_WORKERS, mp_context=_MP_CONTEXT,
+                                            initializer=_preimport)
+                _POOL_PID = pid
+    return _POOL
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Retorna o pool de threads do processo atual, criando-o se necessário"""
+    global _THREAD_POOL, _THREAD_POOL_PID
+    pid = os.getpid()
+    if _THREAD_POOL is None or _THREAD_POOL_PID != pid:
+        with _POOL_LOCK:
+            if _THREAD_POOL is None or _THREAD_POOL_PID != pid:
+                _THREAD_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+                _THREAD_POOL_PID = pid
+    return _THREAD_POOL
+
+def start_pools() -> None:
+    """Cria os pools do processo atual (hook post_fork do gunicorn, antes das threads do worker)"""
+    get_process_pool()
+    get_thread_pool()
+
+atexit.register(_shutdown_pool)
@@ -0,0 +1,25 @@
+# Caracteres de controle problemáticos (inclui o nulo), removidos via translate
+_CTRL_CHARS = [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F]
+_CTRL_TABLE = dict.fromkeys(_CTRL_CHARS, None)
+_CTRL_BYTES = bytes(_CTRL_CHARS)
+
+def sanitize_text(text: str) -> str:
+    """Remove caracteres nulos e UTF-8 inválidos"""
+    if not text:
+        return ""
+    if text.isascii():
+        return text.translate(_CTRL_TABLE)
+    # Bytes de controle nunca fazem parte de sequências UTF-8 multibyte,
+    # então podem ser removidos direto no buffer codificado
+    return text.encode('utf-8', 'replace').translate(None, _CTRL_BYTES).decode('utf-8', 'replace')
+
+# Unidades de format_file_size, cada uma 2**10 vezes a anterior
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+
+def format_file_size(size_bytes: int) -> str:
+    """Formata o tamanho do arquivo para exibição"""
+    # Índice da unidade a partir do número de bits (10 bits por unidade)
+    idx = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1) if size_bytes > 0 else 0
+    if idx == 0:
+        return f"{size_bytes} B"
+    return f"{size_bytes / (1 << (idx * 10)):.1f} {_SIZE_UNITS[idx]}"
@@ -0,0 +1,107 @@
+"""
+Testes do interpretador Ghostscript persistente (executados apenas com o gs instalado)
+
+    python -m unittest discover -s tests -t .
+
+Rode também com PDF_COMPRESSOR_TMPDIR apontando para um link simbólico:
+
+    ln -s /tmp /tmp/pdf-scratch-link
+    PDF_COMPRESSOR_TMPDIR=/tmp/pdf-scratch-link python -m unittest discover -s tests -t .
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.services import pdf_compressor
+from src.services.pdf_compressor import PDFCompressor, _GS_MAXIMUM_ARGS, _GS_OPTIMIZED_ARGS
+from src.utils.files import SCRATCH_DIR
+
+def _scratch_file(suffix: str = '.pdf') -> str:
+    """Arquivo vazio no diretório de trabalho (o único liberado para o worker)"""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SCRATCH_DIR)
+    os.close(fd)
+    return path
+
+def _image_sizes(path: str) -> list:
+    """Dimensões de todas as imagens embutidas, página a página"""
+    return [[image.image.size for image in page.images] for page in PdfReader(path).pages]
+
+@unittest.skipIf(shutil.which('gs') is None, 'Ghostscript não instalado')
+class GhostscriptWorkerTest(unittest.TestCase):
+    
+    def setUp(self):
+        pdf_compressor.refresh_ghostscript_path()
+        self.paths = []
+        
+        # Página com imagem de ruído a 300 DPI: a resolução final depende
+        # dos parâmetros de downsampling de cada tipo de compressão
+        self.input_path = self._track(_scratch_file())
+        noise = Image.effect_noise((1800, 2400), 64).convert('RGB')
+        noise.save(self.input_path, 'PDF', resolution=300)
+    
+    def tearDown(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.unlink(path)
+    
+    def _track(self, path: str) -> str:
+        self.paths.append(path)
+        return path
+    
+    def _run_worker(self, settings) -> str:
+        output_path = self._track(_scratch_file())
+        worker = pdf_compressor._GS_WORKERS[settings]
+        self.assertTrue(worker.submit(self.input_path, output_path))
+        return output_path
+    
+    def _run_oneshot(self, settings) -> str:
+        output_path = self._track(_scratch_file())
+        result = PDFCompressor.run_ghostscript_oneshot(settings, self.input_path, output_path)
+        self.assertEqual(result.returncode, 0)
+        return output_path
+    
+    def test_alternating_jobs_match_oneshot(self):
+        """otimizada -> máxima -> otimizada nos workers dá o mesmo resultado do subprocesso avulso"""
+        expected = {
+            _GS_OPTIMIZED_ARGS: _image_sizes(self._run_oneshot(_GS_OPTIMIZED_ARGS)),
+            _GS_MAXIMUM_ARGS: _image_sizes(self._run_oneshot(_GS_MAXIMUM_ARGS)),
+        }
+        self.assertNotEqual(expected[_GS_OPTIMIZED_ARGS], expected[_GS_MAXIMUM_ARGS])
+        
+        for settings in (_GS_OPTIMIZED_ARGS, _GS_MAXIMUM_ARGS, _GS_OPTIMIZED_ARGS):
+            self.assertEqual(_image_sizes(self._run_worker(settings)), expected[settings])
+    
+    def test_symlinked_paths_are_resolved(self):
+        """Caminhos através de um link simbólico para o diretório de trabalho são aceitos"""
+        link_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, link_dir)
+        link = os.path.join(link_dir, 'scratch')
+        os.symlink(SCRATCH_DIR, link)
+        
+        output_path = self._track(_scratch_file())
+        worker = pdf_compressor._GS_WORKERS[_GS_OPTIMIZED_ARGS]
+        self.assertTrue(worker.submit(
+            os.path.join(link, os.path.basename(self.input_path)),
+            os.path.join(link, os.path.basename(output_path)),
+        ))
+        self.assertTrue(_image_sizes(output_path))
+    
+    def test_invalid_input_does_not_disable_worker(self):
+        """PDFs inválidos falham o job sem contar como falha do interpretador"""
+        worker = pdf_compressor._GS_WORKERS[_GS_OPTIMIZED_ARGS]
+        bad_path = self._track(_scratch_file())
+        with open(bad_path, 'wb') as f:
+            f.write(b'%PDF-1.4\ncorrompido\n%%EOF\n')
+        
+        for _ in range(pdf_compressor.GS_WORKER_MAX_FAILURES + 1):
+            self.assertFalse(worker.submit(bad_path, self._track(_scratch_file())))
+        
+        self._run_worker(_GS_OPTIMIZED_ARGS)
+
+if __name__ == '__main__':
+    unittest.main()